@@ -22,6 +22,11 @@
 
 from . import linux_shell
 
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,7 +39,7 @@ def get_file_list_in_path(path):
 def load_yaml_config(config_path):
 
     with open(config_path, "r") as f:
-        cluster_data = yaml.load(f)
+        cluster_data = yaml.load(f, Loader=YamlLoader)
 
     return cluster_data
 
@@ -16,9 +16,11 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 
+import sys
 import time
 import logging
 import logging.config
+from multiprocessing.pool import ThreadPool
 
 from . import service_stop
 from . import service_template_generate
@@ -33,9 +35,14 @@
 class service_management_stop:
 
 
-    def __init__(self, kube_config_path = None, service_list = None, **kwargs):
+    def __init__(self, kube_config_path = None, service_list = None, max_workers = 8, **kwargs):
         self.logger = logging.getLogger(__name__)
 
+        self.max_workers = max_workers
+
+        # key is the path of service.yaml, value is its parsed content
+        self.service_conf_cache = dict()
+
         self.cluster_object_model = None
 
         self.kube_config_path = None
@@ -56,9 +63,10 @@ def get_service_list(self):
         subdir_list = directory_handler.get_subdirectory_list("src/")
         for subdir in subdir_list:
 
-            service_deploy_dir = "src/{0}/deploy".format(subdir)
+            # service.yaml being a file implies its deploy directory exists
             service_deploy_conf_path = "src/{0}/deploy/service.yaml".format(subdir)
-            if file_handler.directory_exits(service_deploy_dir) and file_handler.file_exist_or_not(service_deploy_conf_path):
+            if file_handler.file_exist_or_not(service_deploy_conf_path):
+                self.load_service_conf(subdir)
                 service_list.append(subdir)
 
         self.logger.info("Get the service-list to manage : {0}".format(str(service_list)))
@@ -67,9 +75,19 @@ def get_service_list(self):
 
 
 
+    def load_service_conf(self, serv):
+
+        service_deploy_conf_path = "src/{0}/deploy/service.yaml".format(serv)
+        if service_deploy_conf_path not in self.service_conf_cache:
+            self.service_conf_cache[service_deploy_conf_path] = file_handler.load_yaml_config(service_deploy_conf_path)
+
+        return self.service_conf_cache[service_deploy_conf_path]
+
+
+
     def start(self, serv):
 
-        service_conf = file_handler.load_yaml_config("src/{0}/deploy/service.yaml".format(serv))
+        service_conf = self.load_service_conf(serv)
         service_stopper = service_stop.service_stop(service_conf, serv)
 
         self.logger.info("----------------------------------------------------------------------")
@@ -91,11 +109,25 @@ def start(self, serv):
 
 
 
+    def start_in_worker(self, serv):
+
+        # linux_shell.execute_shell calls sys.exit on failure, which would silently kill a pool thread.
+        try:
+            self.start(serv)
+        except SystemExit:
+            self.logger.error("Failed to stop service {0}".format(serv))
+            return False
+
+        return True
+
+
+
     def run(self):
 
         config_handler = service_management_configuration.service_management_configuration(kube_config_path = self.kube_config_path)
         self.cluster_object_model = config_handler.run()
 
+        stop_list = list()
         for serv in self.service_list:
             if serv == "cluster-configuration":
                 continue
@@ -103,7 +135,21 @@ def run(self):
                 self.logger.warning("service.yaml can't be found on the directory of {0}".format(serv))
                 self.logger.warning("Please check your source code. The {0}'s service will be skipped.".format(serv))
                 continue
-            self.start(serv)
+            stop_list.append(serv)
+
+        # Services are independent of each other, so stop them concurrently.
+        # cluster-configuration has to be stopped after all of them.
+        if len(stop_list) != 0:
+            pool = ThreadPool(min(self.max_workers, len(stop_list)))
+            try:
+                results = pool.map(self.start_in_worker, stop_list)
+            finally:
+                pool.close()
+                pool.join()
+
+            if False in results:
+                self.logger.error("Failed to stop some of the services, please check the log above.")
+                sys.exit(1)
 
         if "cluster-configuration" in self.service_list:
             self.start("cluster-configuration")
@@ -31,10 +31,13 @@
 
 def parse_docker_inspect(inspect_output):
     obj = json.loads(inspect_output)
+    return parse_inspect_obj(utils.walk_json_field_safe(obj, 0))
+
+def parse_inspect_obj(obj):
     labels = {}
     envs = {}
 
-    obj_labels = utils.walk_json_field_safe(obj, 0, "Config", "Labels")
+    obj_labels = utils.walk_json_field_safe(obj, "Config", "Labels")
     if obj_labels is not None:
         for key in obj_labels:
             if key in targetLabel:
@@ -42,7 +45,7 @@ def parse_docker_inspect(inspect_output):
                 labelVal = obj_labels[key]
                 labels[labelKey] = labelVal
 
-    obj_env = utils.walk_json_field_safe(obj, 0, "Config", "Env")
+    obj_env = utils.walk_json_field_safe(obj, "Config", "Env")
     if obj_env:
         for env in obj_env:
             envItem = env.split("=")
@@ -51,10 +54,25 @@ def parse_docker_inspect(inspect_output):
                 envVal = envItem[1]
                 envs[envKey] = envVal
 
-    pid = utils.walk_json_field_safe(obj, 0, "State", "Pid")
+    pid = utils.walk_json_field_safe(obj, "State", "Pid")
 
     return {"env": envs, "labels": labels, "pid": pid}
 
+def parse_docker_inspect_many(inspect_output, containerIds):
+    """ return dict with key is container id in containerIds and value is inspect info,
+    containers not appear in inspect_output will be missing from the result """
+    objs = json.loads(inspect_output)
+    result = {}
+
+    for obj in objs:
+        fullId = obj.get("Id", "")
+        for containerId in containerIds:
+            if fullId.startswith(containerId):
+                result[containerId] = parse_inspect_obj(obj)
+                break
+
+    return result
+
 def inspect(containerId):
     try:
         logger.debug("ready to run docker inspect")
@@ -66,6 +84,24 @@ def inspect(containerId):
         logger.exception("command '%s' return with error (code %d): %s",
                 e.cmd, e.returncode, e.output)
 
+def inspect_many(containerIds):
+    """ inspect all containers in one docker call, return dict with key is container id """
+    if len(containerIds) == 0:
+        return {}
+
+    try:
+        logger.debug("ready to run docker inspect for %d containers", len(containerIds))
+        # docker will still output inspect info of existing containers if some of them are gone
+        dockerDockerInspect = utils.check_output(["docker", "inspect"] + list(containerIds))
+        return parse_docker_inspect_many(dockerDockerInspect, containerIds)
+    except subprocess.CalledProcessError as e:
+        logger.exception("command '%s' return with error (code %d): %s",
+                e.cmd, e.returncode, e.output)
+    except ValueError:
+        logger.exception("failed to parse docker inspect output")
+
+    return {}
+
 def main(argv):
     containerId = argv[0]
     print inspect(containerId)
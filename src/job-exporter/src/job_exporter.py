@@ -16,7 +16,6 @@
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-import copy
 import sys
 import time
 import logging
@@ -25,6 +24,7 @@
 import subprocess
 import os
 import json
+from multiprocessing.pool import ThreadPool
 
 import docker_stats
 import docker_inspect
@@ -35,11 +35,14 @@
 
 logger = logging.getLogger(__name__)
 
+# used to run per container subprocess calls concurrently
+thread_pool = ThreadPool(16)
+
 
 # k8s will prepend "k8s_" to pod name. There will also be a container name prepend with "k8s_POD_"
 # which is a docker container used to construct network & pid namespace for specific container. These
 # container prepend with "k8s_POD" consume nothing.
-pai_services = map(lambda s: "k8s_" + s, [
+pai_services = (
     "rest-server",
     "pylon",
     "webportal",
@@ -59,7 +62,9 @@
     "job-exporter",
     "yarn-exporter",
     "nvidia-drivers"
-])
+)
+
+pai_service_reg = re.compile(u"^k8s_(" + u"|".join(map(re.escape, pai_services)) + u")")
 
 
 class ZombieRecorder(object):
@@ -72,8 +77,12 @@ def __init__(self):
         # wait 5 minutes to avoid possible cases of normal zombie.
         self.decay_time = datetime.timedelta(minutes=5)
 
+        self.update_count = 0
+
     def update(self, zombie_ids, now):
         """ feed in new zombie ids and get count of decayed zombie """
+        self.update_count += 1
+
         # remove all records not exist anymore
         for z_id in self.zombies.keys():
             if z_id not in zombie_ids:
@@ -95,12 +104,23 @@ def update(self, zombie_ids, now):
     def __len__(self):
         return len(self.zombies)
 
+    def __contains__(self, z_id):
+        return z_id in self.zombies
 
-yarn_pattern = u"container_\w{3}_[0-9]{13}_[0-9]{4}_[0-9]{2}_[0-9]{6}"
+
+yarn_pattern = u"container_\\w{3}_[0-9]{13}_[0-9]{4}_[0-9]{2}_[0-9]{6}"
 yarn_container_reg = re.compile(u"^" + yarn_pattern + "$")
 job_container_reg = re.compile(u"^.+(" + yarn_pattern + u")$")
 
 
+def get_pai_service_name(container_name):
+    """ return pai service name if container_name belongs to a pai service, otherwise None """
+    match = pai_service_reg.match(container_name)
+    if match is not None:
+        return match.group(1)
+    return None
+
+
 def parse_from_labels(labels):
     gpu_ids = []
     other_labels = {}
@@ -133,14 +153,13 @@ def generate_zombie_count_type2(type2_zombies, stats, now):
     zombie_ids = set()
 
     for name in names:
-        if re.match(yarn_container_reg, name) is not None:
+        if yarn_container_reg.match(name) is not None:
             yarn_containers.add(name)
-        elif re.match(job_container_reg, name) is not None:
-            match = re.match(job_container_reg, name)
-            value = match.groups()[0]
-            job_containers[name] = value
-        else:
-            pass # ignore
+            continue
+
+        match = job_container_reg.match(name)
+        if match is not None:
+            job_containers[name] = match.group(1)
 
     for job_name, yarn_name in job_containers.items():
         if yarn_name not in yarn_containers:
@@ -164,13 +183,29 @@ def is_container_exited(container_id):
     return False
 
 
+# how many iterations between rechecking logs of containers already believed exited
+exited_recheck_interval = 10
+
+
 def generate_zombie_count(stats, type1_zombies, type2_zombies):
     """
     There are two types of zombie:
         1. container which outputed "USER COMMAND END" but did not exist for a long period of time
         2. yarn container exited but job container didn't
     """
-    exited_containers = set(filter(is_container_exited, stats.keys()))
+    # container which already outputed "USER COMMAND END" most likely still has it in
+    # the tail of logs, so skip checking containers recorded by type1_zombies. The mark
+    # can scroll out of the tail (e.g. container restarted), so recheck all containers
+    # every exited_recheck_interval iterations.
+    if type1_zombies.update_count % exited_recheck_interval == 0:
+        exited_containers = set()
+    else:
+        exited_containers = set([container_id for container_id in stats.keys()
+            if container_id in type1_zombies])
+    unknown_ids = [container_id for container_id in stats.keys()
+        if container_id not in exited_containers]
+    exited_containers.update([container_id for container_id, exited in
+        zip(unknown_ids, thread_pool.map(is_container_exited, unknown_ids)) if exited])
     logger.debug("exited_containers is %s", exited_containers)
 
     now = datetime.datetime.now()
@@ -186,30 +221,36 @@ def collect_job_metrics(gpu_infos, all_conns, type1_zombies, type2_zombies):
         logger.warning("docker stats returns None")
         return None
 
-    result = []
-    for container_id, stats in stats_obj.items():
-        pai_service_name = None
-
-        # TODO speed this up, since this is O(n^2)
-        for service_name in pai_services:
-            if stats["name"].startswith(service_name):
-                pai_service_name = service_name[4:] # remove "k8s_" prefix
-                break
+    container_ids = list(stats_obj.keys())
+    inspect_infos = docker_inspect.inspect_many(container_ids)
 
-        inspect_info = docker_inspect.inspect(container_id)
-        pid = inspect_info["pid"] if inspect_info is not None else None
+    targets = [] # list of (container_id, pai_service_name, inspect_info)
+    for container_id in container_ids:
+        inspect_info = inspect_infos.get(container_id)
+        pai_service_name = get_pai_service_name(stats_obj[container_id]["name"])
         inspect_labels = utils.walk_json_field_safe(inspect_info, "labels")
 
         if not inspect_labels and pai_service_name is None:
             continue # other container, maybe kubelet or api-server
 
-        # get network consumption, since all our services/jobs running in host network,
-        # network statistic from docker is not specific to that container. We have to
-        # get network statistic by ourselves.
-        lsof_result = network.lsof(pid)
+        targets.append((container_id, pai_service_name, inspect_info))
+
+    # get network consumption, since all our services/jobs running in host network,
+    # network statistic from docker is not specific to that container. We have to
+    # get network statistic by ourselves. lsof are independent subprocess calls per
+    # container, run them concurrently.
+    pids = [inspect_info["pid"] if inspect_info is not None else None
+            for _, _, inspect_info in targets]
+    lsof_results = thread_pool.map(network.lsof, pids)
+
+    result = []
+    for (container_id, pai_service_name, inspect_info), pid, lsof_result in \
+            zip(targets, pids, lsof_results):
+        stats = stats_obj[container_id]
+
         net_in, net_out = network.get_container_network_metrics(all_conns, lsof_result)
         if logger.isEnabledFor(logging.DEBUG):
-            debug_info = utils.check_output("ps -o cmd fp {0} | tail -n 1".format(pid), shell=True)
+            debug_info = utils.get_process_cmdline(pid)
 
             logger.debug("pid %s with cmd `%s` has lsof result %s, in %d, out %d",
                     pid, debug_info, lsof_result, net_in, net_out)
@@ -220,8 +261,7 @@ def collect_job_metrics(gpu_infos, all_conns, type1_zombies, type2_zombies):
 
             for id in gpu_ids:
                 if gpu_infos:
-                    labels = copy.deepcopy(container_labels)
-                    labels["minor_number"] = id
+                    labels = dict(container_labels, minor_number=id)
 
                     result.append(Metric("container_GPUPerc", labels, gpu_infos[id]["gpu_util"]))
                     result.append(Metric("container_GPUMemPerc", labels, gpu_infos[id]["gpu_mem_util"]))
@@ -252,15 +292,16 @@ def collect_job_metrics(gpu_infos, all_conns, type1_zombies, type2_zombies):
 
 def collect_docker_daemon_status():
     """ check docker daemon status in current host """
-    cmd = "systemctl is-active docker | if [ $? -eq 0 ]; then echo \"active\"; else exit 1 ; fi"
+    cmd = ["systemctl", "is-active", "docker"]
     error = "ok"
 
     try:
         logger.info("call systemctl to get docker status")
 
-        out = utils.check_output(cmd, shell=True)
+        out = utils.check_output(cmd)
 
-        if "active" not in out:
+        # systemctl outputs "inactive", "failed" etc if docker is not active
+        if out.strip() != "active":
             error = "inactive"
     except subprocess.CalledProcessError as e:
         logger.exception("command '%s' return with error (code %d): %s",
@@ -274,23 +315,58 @@ def collect_docker_daemon_status():
     return [Metric("docker_daemon_count", {"error": error}, 1)]
 
 
+# key is (path, mtime) of gpu configuration file, value is dict from hostname/ip to gpu count
+gpu_count_cache = {}
+
+
+def load_gpu_counts(path):
+    key = (path, os.stat(path).st_mtime)
+
+    if key not in gpu_count_cache:
+        with open(path) as f:
+            gpu_config = json.load(f)
+
+        gpu_count_cache.clear()
+        gpu_count_cache[key] = dict([(node, conf.get("gpuCount"))
+            for node, conf in gpu_config["nodes"].items()])
+
+    return gpu_count_cache[key]
+
+
 def get_gpu_count(path):
     hostname = os.environ.get("HOSTNAME")
     ip = os.environ.get("HOST_IP")
 
     logger.info("hostname is %s, ip is %s", hostname, ip)
 
-    with open(path) as f:
-        gpu_config = json.load(f)
+    gpu_counts = load_gpu_counts(path)
 
-    if hostname is not None and gpu_config["nodes"].get(hostname) is not None:
-        return gpu_config["nodes"][hostname]["gpuCount"]
-    elif ip is not None and gpu_config["nodes"].get(ip) is not None:
-        return gpu_config["nodes"][ip]["gpuCount"]
+    if hostname is not None and gpu_counts.get(hostname) is not None:
+        return gpu_counts[hostname]
+    elif ip is not None and gpu_counts.get(ip) is not None:
+        return gpu_counts[ip]
     else:
-        logger.warning("failed to find gpu count from config %s", gpu_config)
+        logger.warning("failed to find gpu count from config %s", gpu_counts)
         return 0
 
+def schedule_next_tick(next_tick, interval_s):
+    """ start iterations at fixed interval regardless of how long an iteration took,
+    return (seconds to sleep, next tick). time.time() is wall clock, so reset the
+    schedule if it is out of range of one interval, e.g. clock set back by ntp """
+    next_tick += interval_s
+    now = time.time()
+    sleep_s = next_tick - now
+
+    if sleep_s <= 0:
+        logger.warning("iteration took longer than %ds, start next iteration immediately", interval_s)
+        return 0, now
+    elif sleep_s > interval_s:
+        logger.warning("clock went backwards by %.1fs, reset schedule", sleep_s - interval_s)
+        return interval_s, now + interval_s
+
+    return sleep_s, next_tick
+
+
 def main(argv):
     log_dir = argv[0]
     gpu_metrics_path = log_dir + "/gpu_exporter.prom"
@@ -313,6 +389,8 @@ def main(argv):
     utils.export_metrics_to_file(configured_gpu_path, [Metric("configured_gpu_count", {},
         configured_gpu_count)])
 
+    next_tick = time.time()
+
     while True:
         start = datetime.datetime.now()
         try:
@@ -344,10 +422,12 @@ def main(argv):
         finally:
             end = datetime.datetime.now()
 
-            time_metrics = [Metric("job_exporter_iteration_seconds", {}, (end - start).seconds)]
+            time_metrics = [Metric("job_exporter_iteration_seconds", {}, (end - start).total_seconds())]
             utils.export_metrics_to_file(time_metrics_path, time_metrics)
 
-        time.sleep(time_sleep_s)
+        sleep_s, next_tick = schedule_next_tick(next_tick, time_sleep_s)
+        if sleep_s > 0:
+            time.sleep(sleep_s)
 
 
 def get_logging_level():
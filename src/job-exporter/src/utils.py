@@ -16,6 +16,7 @@
 # DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import os
 import re
 import codecs
 import subprocess
@@ -53,12 +54,14 @@ def __repr__(self):
 
 def export_metrics_to_file(path, metrics):
     """ if metrics not None, should still open the path, to modify time stamp of file,
-    readiness probe needs this"""
-    with codecs.open(path, "w", encoding="utf-8") as f:
+    readiness probe needs this.
+    Metrics are written to a temp file and renamed to path, so that prometheus
+    textfile collector will never read a half written file """
+    tmp_path = path + ".tmp"
+    with codecs.open(tmp_path, "w", encoding="utf-8", buffering=1 << 16) as f:
         if metrics is not None:
-            for metric in metrics:
-                f.write(str(metric))
-                f.write("\n")
+            f.write("".join([str(metric) + "\n" for metric in metrics]))
+    os.rename(tmp_path, path)
 
 
 def check_output(*args, **kwargs):
@@ -79,6 +82,15 @@ def check_output(*args, **kwargs):
     return "".join(outs)
 
 
+def get_process_cmdline(pid):
+    """ read cmdline of process from /proc, avoid forking ps, return None if not available """
+    try:
+        with open("/proc/{0}/cmdline".format(pid), "rb") as f:
+            return f.read().replace("\x00", " ").strip()
+    except IOError:
+        return None
+
+
 class Singleton(object):
     """ wrapper around metrics getter, because getter may block
         indefinitely, so we wrap call in thread.
@@ -25,6 +25,7 @@
 sys.path.append(os.path.abspath("../src/"))
 
 from docker_inspect import parse_docker_inspect
+from docker_inspect import parse_docker_inspect_many
 
 class TestDockerInspect(unittest.TestCase):
     """
@@ -59,5 +60,13 @@ def test_parse_docker_inspect(self):
         target_inspect_info = {"labels": {"container_label_PAI_USER_NAME": "openmindstudio", "container_label_GPU_ID": "0,1,", "container_label_PAI_HOSTNAME": "paigcr-a-gpu-1058", "container_label_PAI_JOB_NAME": "trialslot_nnimain_d65bc5ac", "container_label_PAI_CURRENT_TASK_ROLE_NAME": "tuner"}, "env": {"container_env_PAI_TASK_INDEX": "0"}, "pid": 95539}
         self.assertEqual(target_inspect_info, inspect_info)
 
+    def test_parse_docker_inspect_many(self):
+        sample_path = "data/docker_inspect_sample.json"
+        with open(sample_path, "r") as f:
+            docker_inspect = f.read()
+        inspect_infos = parse_docker_inspect_many(docker_inspect, ["8c3f365e97e0", "33a22dcd4ba3"])
+        self.assertEqual(["8c3f365e97e0"], inspect_infos.keys())
+        self.assertEqual(parse_docker_inspect(docker_inspect), inspect_infos["8c3f365e97e0"])
+
 if __name__ == '__main__':
     unittest.main()
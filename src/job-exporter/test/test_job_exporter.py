@@ -63,6 +63,20 @@ def test_parse_from_labels(self):
         copied.pop("container_label_GPU_ID")
         self.assertEqual(copied, otherLabels)
 
+    def test_get_pai_service_name(self):
+        self.assertEqual("rest-server",
+                job_exporter.get_pai_service_name("k8s_rest-server_rest-server-ds-5tvvh_default_0"))
+        self.assertEqual("hadoop-node-manager",
+                job_exporter.get_pai_service_name("k8s_hadoop-node-manager_hadoop-node-manager-ds-2sbkr_default_0"))
+        self.assertIsNone(job_exporter.get_pai_service_name("k8s_POD_rest-server-ds-5tvvh_default_0"))
+        self.assertIsNone(job_exporter.get_pai_service_name("container_e03_1539312078880_0780_01_000002"))
+
+        # every service should still be recognized after repeated lookups
+        for _ in range(2):
+            for service_name in job_exporter.pai_services:
+                self.assertEqual(service_name,
+                        job_exporter.get_pai_service_name("k8s_{0}_{0}-ds-5tvvh_default_0".format(service_name)))
+
     def test_generate_zombie_count_type1(self):
         zombies = job_exporter.ZombieRecorder()
 
@@ -129,5 +143,100 @@ def test_generate_zombie_count_type2(self):
                 job_exporter.generate_zombie_count_type2(zombies, stats,
                     start + zombies.decay_time + 3 * one_sec))
 
+    def test_generate_zombie_count_skip_known_exited(self):
+        type1_zombies = job_exporter.ZombieRecorder()
+        type2_zombies = job_exporter.ZombieRecorder()
+
+        stats = {"43ffe701d883": {"name": "a"}, "8de2f53e64cb": {"name": "b"}}
+
+        checked = []
+        def is_container_exited(container_id):
+            checked.append(container_id)
+            return container_id == "43ffe701d883"
+
+        origin = job_exporter.is_container_exited
+        job_exporter.is_container_exited = is_container_exited
+        try:
+            job_exporter.generate_zombie_count(stats, type1_zombies, type2_zombies)
+            self.assertEqual({"43ffe701d883", "8de2f53e64cb"}, set(checked))
+            self.assertTrue("43ffe701d883" in type1_zombies)
+
+            del checked[:]
+            job_exporter.generate_zombie_count(stats, type1_zombies, type2_zombies)
+            self.assertEqual(["8de2f53e64cb"], checked)
+            self.assertTrue("43ffe701d883" in type1_zombies)
+        finally:
+            job_exporter.is_container_exited = origin
+
+    def test_generate_zombie_count_recheck_known_exited(self):
+        type1_zombies = job_exporter.ZombieRecorder()
+        type2_zombies = job_exporter.ZombieRecorder()
+
+        stats = {"43ffe701d883": {"name": "a"}}
+
+        exited = [True]
+        checked = []
+        def is_container_exited(container_id):
+            checked.append(container_id)
+            return exited[0]
+
+        origin = job_exporter.is_container_exited
+        job_exporter.is_container_exited = is_container_exited
+        try:
+            job_exporter.generate_zombie_count(stats, type1_zombies, type2_zombies)
+            self.assertTrue("43ffe701d883" in type1_zombies)
+
+            # "USER COMMAND END" scrolled out of logs, recorded container is kept until recheck
+            exited[0] = False
+            del checked[:]
+            for _ in range(job_exporter.exited_recheck_interval - 1):
+                job_exporter.generate_zombie_count(stats, type1_zombies, type2_zombies)
+                self.assertTrue("43ffe701d883" in type1_zombies)
+            self.assertEqual([], checked)
+
+            job_exporter.generate_zombie_count(stats, type1_zombies, type2_zombies)
+            self.assertEqual(["43ffe701d883"], checked)
+            self.assertFalse("43ffe701d883" in type1_zombies)
+        finally:
+            job_exporter.is_container_exited = origin
+
+    def test_get_gpu_count(self):
+        sample_path = "data/gpu_configuration_sample.json"
+
+        origin_env = dict(os.environ)
+        try:
+            os.environ["HOSTNAME"] = "paigcr-a-gpu-1058"
+            os.environ["HOST_IP"] = "10.151.40.4"
+            self.assertEqual(4, job_exporter.get_gpu_count(sample_path))
+
+            os.environ["HOSTNAME"] = "not-exist"
+            self.assertEqual(8, job_exporter.get_gpu_count(sample_path))
+
+            os.environ["HOST_IP"] = "not-exist"
+            self.assertEqual(0, job_exporter.get_gpu_count(sample_path))
+        finally:
+            os.environ.clear()
+            os.environ.update(origin_env)
+
+    def test_schedule_next_tick(self):
+        now = [1000.0]
+
+        origin = job_exporter.time.time
+        job_exporter.time.time = lambda: now[0]
+        try:
+            # normal iteration took 5s of 30s interval
+            now[0] = 1005.0
+            self.assertEqual((25.0, 1030.0), job_exporter.schedule_next_tick(1000.0, 30))
+
+            # iteration took longer than interval
+            now[0] = 1040.0
+            self.assertEqual((0, 1040.0), job_exporter.schedule_next_tick(1000.0, 30))
+
+            # clock set back by an hour, should not sleep more than one interval
+            now[0] = 1005.0 - 3600
+            self.assertEqual((30, 1005.0 - 3600 + 30), job_exporter.schedule_next_tick(1000.0, 30))
+        finally:
+            job_exporter.time.time = origin
+
 if __name__ == '__main__':
     unittest.main()
@@ -73,9 +73,19 @@ def test_export_metrics_to_file(self):
         metrics.append(Metric("bar", {}, "4"))
         with tempfile.NamedTemporaryFile() as f:
             utils.export_metrics_to_file(f.name, metrics)
-            lines = f.readlines()
+            # file is replaced by rename, open it again to get new content
+            with open(f.name) as new_f:
+                lines = new_f.readlines()
+            self.assertEqual(2, len(lines))
             self.assertEqual("foo{bar=\"2\"} 3", lines[0].strip())
             self.assertEqual("bar 4", lines[1].strip())
+            self.assertFalse(os.path.exists(f.name + ".tmp"))
+
+    def test_get_process_cmdline(self):
+        cmdline = utils.get_process_cmdline(os.getpid())
+        self.assertIn("python", cmdline)
+
+        self.assertIsNone(utils.get_process_cmdline("not-exist"))
 
     def test_singleton_normal(self):
         def getter():